@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Cohort Analytics Report
+Stratified summaries over scored calculator outputs:
+  • Risk-tier distributions by unit and date
+  • Score percentiles per calculator
+  • Risk-tier transition counts over time
+
+Input is one or more CSV files of scored outputs with a header row containing
+at least: patient_id, unit, timestamp (ISO 8601), calculator, score, risk_level.
+Records are one per line, UTF-8 encoded; quoted fields containing newlines are
+not supported. Blank lines are ignored; lines that cannot be used (unbalanced
+quotes, invalid UTF-8, missing fields, bad scores) are reported as skipped
+lines, so a record broken across two lines counts twice.
+Transitions are counted in file order, which matches time order for an
+append-only scoring log. Rows whose timestamp is earlier than the previous row
+for the same patient/calculator (e.g. interleaved sources, files passed out of
+order) are counted and reported as out of order, since the transition counts
+around them are unreliable. Timestamps are compared as strings, so they must
+share one ISO 8601 format.
+
+Files are split into byte-range chunks that are aggregated in parallel worker
+processes; the partial aggregates are merged in the parent and rendered as a
+text report (and optionally as JSON).
+
+Usage:
+    python3 cohort_analytics.py scored_2026_09.csv --workers 8 --json report.json
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Tuple
+
+REQUIRED_COLUMNS = ("patient_id", "unit", "timestamp", "calculator", "score", "risk_level")
+RISK_TIERS = ("low", "moderate", "high", "critical")
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+MIN_CHUNK_SIZE = 1024 * 1024  # bytes
+CHUNKS_PER_WORKER = 4
+
+
+def default_chunk_size(paths: List[str], workers: int) -> int:
+    """
+    Size chunks so every worker gets several of them (keeps the pool busy when
+    chunks finish unevenly), without going below MIN_CHUNK_SIZE.
+    """
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+    return max(total_bytes // (max(workers, 1) * CHUNKS_PER_WORKER), MIN_CHUNK_SIZE)
+
+
+def plan_chunks(paths: List[str], chunk_size: int) -> List[Tuple[int, str, int, int, Dict[str, int]]]:
+    """
+    Split each file into byte ranges of roughly chunk_size bytes.
+    Returns (order, path, start, end, column_index) tuples in file order.
+    """
+    chunks = []
+    for path in paths:
+        with open(path, "rb") as f:
+            header_line = f.readline()
+            data_start = f.tell()
+        header = next(csv.reader([header_line.decode("utf-8-sig")]))
+        columns = {name.strip().lower(): i for i, name in enumerate(header)}
+        missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+        if missing:
+            raise ValueError(f"{path}: missing required column(s): {', '.join(missing)}")
+
+        size = os.path.getsize(path)
+        start = data_start
+        while start < size:
+            end = min(start + chunk_size, size)
+            chunks.append((len(chunks), path, start, end, columns))
+            start = end
+    return chunks
+
+
+def _read_range(path: str, start: int, end: int) -> List[bytes]:
+    """
+    Read the lines that begin inside [start, end). A line straddling the end
+    boundary belongs to this chunk; one straddling the start belongs to the
+    previous chunk. Lines are split on b"\n" only, so stray \x0b or \u2028
+    characters inside a field stay in that field (a bare \r is kept only in a
+    quoted field; csv rejects it in an unquoted one). Lines are returned
+    undecoded so the caller can skip any that are not valid UTF-8.
+    """
+    with open(path, "rb") as f:
+        if start > 0:
+            f.seek(start - 1)
+            if f.read(1) != b"\n":
+                f.readline()
+        else:
+            f.seek(start)
+        data = f.read(max(end - f.tell(), 0))
+        if data and not data.endswith(b"\n"):
+            data += f.readline()
+    lines = data.split(b"\n")
+    if lines and not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def aggregate_chunk(task: Tuple[int, str, int, int, Dict[str, int]]) -> Dict[str, Any]:
+    """
+    Worker: aggregate one byte range into partial counters.
+
+    Transitions inside the chunk are counted directly; the first and last
+    (timestamp, tier) of every patient/calculator sequence are returned so the
+    parent can stitch sequences that cross chunk boundaries.
+    """
+    order, path, start, end, columns = task
+    i_patient = columns["patient_id"]
+    i_unit = columns["unit"]
+    i_timestamp = columns["timestamp"]
+    i_calculator = columns["calculator"]
+    i_score = columns["score"]
+    i_risk = columns["risk_level"]
+    width = max(i_patient, i_unit, i_timestamp, i_calculator, i_score, i_risk) + 1
+
+    tiers = Counter()        # (calculator, unit, date, tier) -> rows
+    scores = Counter()       # (calculator, score) -> rows
+    transitions = Counter()  # (calculator, date, from_tier, to_tier) -> count
+    first: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    last: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    rows = 0
+    skipped = 0
+    out_of_order = 0
+
+    lines = []
+    for raw in _read_range(path, start, end):
+        if not raw.strip():
+            continue
+        try:
+            line = raw.decode("utf-8")
+        except UnicodeDecodeError:
+            skipped += 1
+            continue
+        # A quoted field spanning lines could straddle a chunk boundary and parse
+        # differently per chunk size; such records are not supported and skipped
+        if line.count('"') % 2:
+            skipped += 1
+        else:
+            lines.append(line)
+
+    # The reader is fed one line per item, so a csv.Error (e.g. a bare \r in an
+    # unquoted field) only affects that line and parsing resumes at the next one
+    reader = csv.reader(lines)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except csv.Error:
+            skipped += 1
+            continue
+        if len(row) < width:
+            skipped += 1
+            continue
+        calculator = row[i_calculator]
+        tier = row[i_risk].strip().lower()
+        timestamp = row[i_timestamp].strip()
+        date = timestamp[:10]
+        try:
+            score = float(row[i_score])
+        except ValueError:
+            skipped += 1
+            continue
+        if not math.isfinite(score):
+            skipped += 1
+            continue
+
+        rows += 1
+        tiers[(calculator, row[i_unit], date, tier)] += 1
+        scores[(calculator, score)] += 1
+
+        key = (row[i_patient], calculator)
+        previous = last.get(key)
+        if previous is None:
+            first[key] = (timestamp, tier)
+        else:
+            if timestamp < previous[0]:
+                out_of_order += 1
+            if previous[1] != tier:
+                transitions[(calculator, date, previous[1], tier)] += 1
+        last[key] = (timestamp, tier)
+
+    return {
+        "order": order,
+        "rows": rows,
+        "skipped": skipped,
+        "out_of_order": out_of_order,
+        "tiers": tiers,
+        "scores": scores,
+        "transitions": transitions,
+        "first": first,
+        "last": last,
+    }
+
+
+def merge_partials(partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge worker aggregates in chunk order, stitching boundary transitions"""
+    tiers = Counter()
+    scores = Counter()
+    transitions = Counter()
+    last: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    rows = 0
+    skipped = 0
+    out_of_order = 0
+
+    for partial in sorted(partials, key=lambda p: p["order"]):
+        rows += partial["rows"]
+        skipped += partial["skipped"]
+        out_of_order += partial["out_of_order"]
+        tiers.update(partial["tiers"])
+        scores.update(partial["scores"])
+        transitions.update(partial["transitions"])
+
+        for key, (timestamp, tier) in partial["first"].items():
+            previous = last.get(key)
+            if previous is None:
+                continue
+            if timestamp < previous[0]:
+                out_of_order += 1
+            if previous[1] != tier:
+                transitions[(key[1], timestamp[:10], previous[1], tier)] += 1
+        last.update(partial["last"])
+
+    return {
+        "rows": rows,
+        "skipped": skipped,
+        "out_of_order": out_of_order,
+        "patients": len({patient for patient, _ in last}),
+        "tiers": tiers,
+        "scores": scores,
+        "transitions": transitions,
+    }
+
+
+def score_percentiles(scores: Counter, percentiles: List[float]) -> Dict[str, Dict[str, float]]:
+    """Nearest-rank percentiles per calculator from the merged score histogram"""
+    histograms: Dict[str, List[Tuple[float, int]]] = {}
+    for (calculator, score), count in scores.items():
+        histograms.setdefault(calculator, []).append((score, count))
+
+    result = {}
+    for calculator, histogram in sorted(histograms.items()):
+        histogram.sort()
+        total = sum(count for _, count in histogram)
+        values = {}
+        for p in percentiles:
+            rank = max(1, -(-p * total // 100))  # ceil(p/100 * total)
+            seen = 0
+            for score, count in histogram:
+                seen += count
+                if seen >= rank:
+                    values[f"p{p:g}"] = score
+                    break
+        result[calculator] = {"n": total, **values}
+    return result
+
+
+def build_report(merged: Dict[str, Any], percentiles: List[float]) -> Dict[str, Any]:
+    """Shape merged aggregates into a JSON-serialisable report"""
+    distribution: Dict[str, Dict[str, Dict[str, Dict[str, int]]]] = {}
+    for (calculator, unit, date, tier), count in sorted(merged["tiers"].items()):
+        distribution.setdefault(calculator, {}).setdefault(unit, {}).setdefault(date, {})[tier] = count
+
+    transitions: Dict[str, Dict[str, Dict[str, int]]] = {}
+    for (calculator, date, from_tier, to_tier), count in sorted(merged["transitions"].items()):
+        transitions.setdefault(calculator, {}).setdefault(date, {})[f"{from_tier}->{to_tier}"] = count
+
+    return {
+        "rows": merged["rows"],
+        "skipped_lines": merged["skipped"],
+        "out_of_order_rows": merged["out_of_order"],
+        "patients": merged["patients"],
+        "tier_distribution": distribution,
+        "score_percentiles": score_percentiles(merged["scores"], percentiles),
+        "tier_transitions": transitions,
+    }
+
+
+def _tier_columns(labels) -> List[str]:
+    """Known tiers in severity order, followed by any unexpected labels"""
+    return list(RISK_TIERS) + sorted(set(labels) - set(RISK_TIERS))
+
+
+def print_report(report: Dict[str, Any], elapsed: float, out=sys.stdout) -> None:
+    """Print the cohort report as formatted text"""
+    def emit(line: str = "") -> None:
+        print(line, file=out)
+
+    emit("\n" + "="*80)
+    emit("COHORT ANALYTICS REPORT")
+    emit("="*80)
+    emit(f"Rows aggregated: {report['rows']:,}")
+    emit(f"Lines skipped:   {report['skipped_lines']:,}")
+    emit(f"Out of order:    {report['out_of_order_rows']:,}")
+    emit(f"Patients:        {report['patients']:,}")
+    emit(f"Elapsed:         {elapsed:.1f}s")
+
+    emit("\n" + "="*80)
+    emit("Risk-Tier Distribution by Unit and Date")
+    emit("="*80)
+    for calculator, units in report["tier_distribution"].items():
+        labels = set()
+        for dates in units.values():
+            for counts in dates.values():
+                labels.update(counts)
+        columns = _tier_columns(labels)
+        emit(f"\n{calculator}")
+        emit("-" * 80)
+        emit(f"{'Unit':<16}{'Date':<12}" + "".join(f"{c:>10}" for c in columns) + f"{'Total':>10}")
+        for unit, dates in units.items():
+            for date, counts in dates.items():
+                cells = "".join(f"{counts.get(c, 0):>10}" for c in columns)
+                emit(f"{unit[:15]:<16}{date:<12}{cells}{sum(counts.values()):>10}")
+
+    emit("\n" + "="*80)
+    emit("Score Percentiles")
+    emit("="*80)
+    for calculator, values in report["score_percentiles"].items():
+        cells = "  ".join(f"{k}={v:g}" for k, v in values.items() if k != "n")
+        emit(f"  {calculator}: n={values['n']:,}  {cells}")
+
+    emit("\n" + "="*80)
+    emit("Risk-Tier Transitions over Time")
+    emit("="*80)
+    for calculator, dates in report["tier_transitions"].items():
+        emit(f"\n{calculator}")
+        emit("-" * 80)
+        for date, counts in dates.items():
+            cells = ", ".join(f"{k}: {v}" for k, v in counts.items())
+            emit(f"  {date}  {cells}")
+    emit("\n" + "="*80)
+
+
+def run(paths: List[str], workers: int, chunk_size: int = None,
+        percentiles: List[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+    """
+    Plan chunks, aggregate them in a process pool and merge the results.
+    chunk_size defaults to an even split of the input across the workers.
+    """
+    if chunk_size is None:
+        chunk_size = default_chunk_size(paths, workers)
+    chunks = plan_chunks(paths, chunk_size)
+    if workers <= 1 or len(chunks) <= 1:
+        partials = [aggregate_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(aggregate_chunk, chunks))
+    return build_report(merge_partials(partials), percentiles)
+
+
+def _percentile(value: str) -> float:
+    """argparse type: a percentile between 0 and 100"""
+    try:
+        p = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid percentile: {value!r}")
+    if not 0 <= p <= 100:
+        raise argparse.ArgumentTypeError(f"percentile must be between 0 and 100: {value}")
+    return p
+
+
+def _positive_int(value: str) -> int:
+    """argparse type: an integer greater than zero"""
+    try:
+        n = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer: {value!r}")
+    if n <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0: {value}")
+    return n
+
+
+def _positive_float(value: str) -> float:
+    """argparse type: a finite number greater than zero"""
+    try:
+        x = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {value!r}")
+    if not (math.isfinite(x) and x > 0):
+        raise argparse.ArgumentTypeError(f"must be greater than 0: {value}")
+    return x
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cohort analytics report over scored calculator outputs")
+    parser.add_argument("inputs", nargs="+", help="Scored output CSV file(s), in chronological order")
+    parser.add_argument("--workers", type=_positive_int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-mb", type=_positive_float,
+                        help="Approximate chunk size in MB (default: input size split "
+                             f"{CHUNKS_PER_WORKER} ways per worker, at least 1)")
+    parser.add_argument("--percentiles", type=_percentile, nargs="+", default=list(DEFAULT_PERCENTILES),
+                        help="Score percentiles to report (default: 5 25 50 75 95)")
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON to this path")
+    parser.add_argument("--quiet", action="store_true", help="Do not print the text report")
+    args = parser.parse_args(argv)
+
+    if args.json_path:
+        # Fail before the aggregation work, without truncating an existing report
+        json_dir = os.path.dirname(os.path.abspath(args.json_path))
+        if os.path.isdir(args.json_path) or not os.access(json_dir, os.W_OK):
+            print(f"Error: cannot write JSON report to {args.json_path}", file=sys.stderr)
+            return 1
+
+    started = time.perf_counter()
+    try:
+        chunk_size = max(int(args.chunk_mb * 1024 * 1024), 1) if args.chunk_mb else None
+        report = run(args.inputs, args.workers, chunk_size, args.percentiles)
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump(report, f, indent=2)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+
+    if report["out_of_order_rows"]:
+        print(f"Warning: {report['out_of_order_rows']:,} row(s) out of chronological order "
+              "per patient/calculator; tier transitions may be miscounted", file=sys.stderr)
+    if not args.quiet:
+        print_report(report, elapsed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Cohort Analytics Test Suite
+Checks that chunked/parallel aggregation matches a single serial pass and
+that boundary stitching, percentiles and input validation behave correctly
+"""
+
+import csv
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+from contextlib import redirect_stderr, redirect_stdout
+
+import cohort_analytics
+
+HEADER = ["patient_id", "unit", "timestamp", "calculator", "score", "risk_level"]
+TIERS = ["low", "moderate", "high", "critical"]
+
+
+class CohortAnalyticsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_csv(self, name: str, rows) -> str:
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(HEADER)
+            writer.writerows(rows)
+        return path
+
+    def generated_rows(self, count: int):
+        rng = random.Random(26)
+        for i in range(count):
+            score = rng.randint(0, 24)
+            yield [
+                f"P{rng.randint(1, 40)}",
+                rng.choice(["ICU", "ED", "WARD"]),
+                f"2026-09-{1 + i * 30 // count:02d}T{i % 24:02d}:00:00",
+                rng.choice(["SOFA", "qSOFA"]),
+                score,
+                TIERS[min(score // 6, 3)],
+            ]
+
+    def test_chunked_matches_serial(self):
+        path = self.write_csv("scored.csv", self.generated_rows(3000))
+        serial = cohort_analytics.run([path], workers=1, chunk_size=1 << 30)
+        self.assertEqual(serial["rows"], 3000)
+        for chunk_size in (1, 97, 4096):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(cohort_analytics.run([path], workers=1, chunk_size=chunk_size), serial)
+        self.assertEqual(cohort_analytics.run([path], workers=2, chunk_size=4096), serial)
+
+    def test_every_line_read_once_at_any_boundary(self):
+        path = self.write_csv("scored.csv", self.generated_rows(50))
+        with open(path, "rb") as f:
+            expected = f.read().split(b"\n")[1:-1]
+        for chunk_size in range(1, 120, 7):
+            lines = []
+            for _, chunk_path, start, end, _ in cohort_analytics.plan_chunks([path], chunk_size):
+                lines.extend(cohort_analytics._read_range(chunk_path, start, end))
+            self.assertEqual(lines, expected, f"chunk_size={chunk_size}")
+
+    def test_transition_across_chunks_counted_once(self):
+        path = self.write_csv("scored.csv", [
+            ["P1", "ICU", "2026-09-01T00:00", "SOFA", 2, "low"],
+            ["P1", "ICU", "2026-09-02T00:00", "SOFA", 9, "high"],
+        ])
+        # chunk_size=1 puts each row in its own chunk
+        report = cohort_analytics.run([path], workers=1, chunk_size=1)
+        self.assertEqual(report["tier_transitions"], {"SOFA": {"2026-09-02": {"low->high": 1}}})
+
+    def test_transition_across_files_counted_once(self):
+        first = self.write_csv("a.csv", [["P1", "ICU", "2026-09-01T00:00", "SOFA", 2, "low"]])
+        second = self.write_csv("b.csv", [["P1", "ICU", "2026-09-02T00:00", "SOFA", 9, "high"]])
+        report = cohort_analytics.run([first, second], workers=1)
+        self.assertEqual(report["tier_transitions"], {"SOFA": {"2026-09-02": {"low->high": 1}}})
+        self.assertEqual(report["out_of_order_rows"], 0)
+
+    def test_out_of_order_rows_reported(self):
+        first = self.write_csv("a.csv", [["P1", "ICU", "2026-09-02T00:00", "SOFA", 9, "high"]])
+        second = self.write_csv("b.csv", [["P1", "ICU", "2026-09-01T00:00", "SOFA", 2, "low"]])
+        self.assertEqual(cohort_analytics.run([first, second], workers=1)["out_of_order_rows"], 1)
+        self.assertEqual(cohort_analytics.run([second, first], workers=1)["out_of_order_rows"], 0)
+
+    def test_percentiles_on_known_histogram(self):
+        # Scores 1..10 once each, plus 10 nine more times: n = 19
+        scores = Counter({("SOFA", float(s)): 1 for s in range(1, 11)})
+        scores[("SOFA", 10.0)] += 9
+        result = cohort_analytics.score_percentiles(scores, [0, 25, 50, 100])
+        self.assertEqual(result["SOFA"], {"n": 19, "p0": 1.0, "p25": 5.0, "p50": 10.0, "p100": 10.0})
+
+    def test_non_finite_and_malformed_rows_skipped(self):
+        path = self.write_csv("scored.csv", [
+            ["P1", "ICU", "2026-09-01T00:00", "SOFA", "nan", "low"],
+            ["P1", "ICU", "2026-09-01T01:00", "SOFA", "-inf", "low"],
+            ["P1", "ICU", "2026-09-01T02:00", "SOFA", "n/a", "low"],
+            ["P1", "ICU", "2026-09-01T03:00", "SOFA", 3, "low"],
+        ])
+        with open(path, "a") as f:
+            f.write('P2,"multi\nline",2026-09-01T00:00,SOFA,1,low\n\n\r\n')
+        report = cohort_analytics.run([path], workers=1)
+        # Three bad scores plus both lines of the multi-line record; blank lines are ignored
+        self.assertEqual((report["rows"], report["skipped_lines"]), (1, 5))
+        self.assertEqual(report["score_percentiles"]["SOFA"]["p50"], 3.0)
+
+    def test_invalid_utf8_line_skipped(self):
+        path = self.write_csv("scored.csv", [["P1", "ICU", "2026-09-01T00:00", "SOFA", 3, "low"]])
+        with open(path, "ab") as f:
+            f.write("P2,Unit\u00e9,2026-09-01T00:00,SOFA,4,low\n".encode("latin-1"))
+        report = cohort_analytics.run([path], workers=1)
+        self.assertEqual((report["rows"], report["skipped_lines"]), (1, 1))
+
+    def test_fields_keep_non_newline_line_breaks(self):
+        path = self.write_csv("scored.csv", [["P1", "IC\x0bU\u2028", "2026-09-01T00:00", "SOFA", 3, "low"]])
+        with open(path, "a", newline="") as f:
+            f.write('P2,"C\rCU",2026-09-01T00:00,SOFA,4,low\n')
+            f.write("P3,E\rD,2026-09-01T00:00,SOFA,5,low\n")
+        report = cohort_analytics.run([path], workers=1, chunk_size=1)
+        # The quoted \r survives; the bare \r in an unquoted field is a skipped line
+        self.assertEqual(report["rows"], 2)
+        self.assertEqual(report["skipped_lines"], 1)
+        self.assertEqual(set(report["tier_distribution"]["SOFA"]), {"IC\x0bU\u2028", "C\rCU"})
+
+    def test_default_chunk_size_splits_across_workers(self):
+        path = self.write_csv("scored.csv", self.generated_rows(10))
+        with open(path, "a") as f:
+            f.truncate(8 * cohort_analytics.MIN_CHUNK_SIZE)
+        self.assertEqual(cohort_analytics.default_chunk_size([path], 2), cohort_analytics.MIN_CHUNK_SIZE)
+        self.assertEqual(cohort_analytics.default_chunk_size([path], 64), cohort_analytics.MIN_CHUNK_SIZE)
+        self.assertEqual(cohort_analytics.default_chunk_size([path], 1), 2 * cohort_analytics.MIN_CHUNK_SIZE)
+
+    def test_cli_rejects_out_of_range_percentiles(self):
+        path = self.write_csv("scored.csv", self.generated_rows(10))
+        for value in ("150", "-1", "nan"):
+            with self.subTest(value=value), redirect_stderr(io.StringIO()):
+                with self.assertRaises(SystemExit):
+                    cohort_analytics.main([path, "--percentiles", value])
+
+    def test_cli_rejects_non_positive_workers_and_chunk_size(self):
+        path = self.write_csv("scored.csv", self.generated_rows(10))
+        for option, value in (("--workers", "0"), ("--workers", "-3"), ("--chunk-mb", "-1"), ("--chunk-mb", "0")):
+            with self.subTest(option=option, value=value), redirect_stderr(io.StringIO()):
+                with self.assertRaises(SystemExit):
+                    cohort_analytics.main([path, option, value])
+
+    def test_cli_bad_json_path_is_an_error(self):
+        path = self.write_csv("scored.csv", self.generated_rows(10))
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            code = cohort_analytics.main([path, "--quiet", "--json", os.path.join(self.tmpdir, "missing", "x.json")])
+        self.assertEqual(code, 1)
+        self.assertIn("Error:", stderr.getvalue())
+
+    def test_cli_failure_keeps_existing_json(self):
+        out = os.path.join(self.tmpdir, "report.json")
+        with open(out, "w") as f:
+            f.write('{"rows": 1}')
+        with redirect_stderr(io.StringIO()):
+            code = cohort_analytics.main([os.path.join(self.tmpdir, "missing.csv"), "--json", out])
+        self.assertEqual(code, 1)
+        with open(out) as f:
+            self.assertEqual(f.read(), '{"rows": 1}')
+
+    def test_cli_writes_valid_json(self):
+        path = self.write_csv("scored.csv", self.generated_rows(100))
+        out = os.path.join(self.tmpdir, "report.json")
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(cohort_analytics.main([path, "--workers", "1", "--json", out]), 0)
+        with open(out) as f:
+            self.assertEqual(json.load(f)["rows"], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()